@@ -1,45 +1,65 @@
-from pydantic_settings import BaseSettings
+from dataclasses import dataclass
+import functools
 import os
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
 from typing import Optional
 
+# Locate the .env file the same way load_dotenv() does
+_ENV_FILE = find_dotenv()
+
+@functools.lru_cache(maxsize=1)
+def _load_env(mtime_ns, size):
+    """
+    Load the .env file into os.environ without overriding existing variables
+
+    Keyed on the file's exact mtime and size, so repeat calls are a no-op unless .env has changed.
+    """
+    load_dotenv(_ENV_FILE, override=False)
+
 # Load environment variables from .env file
-load_dotenv()
+if _ENV_FILE:
+    try:
+        _stat = os.stat(_ENV_FILE)
+        _load_env(_stat.st_mtime_ns, _stat.st_size)
+    except FileNotFoundError:
+        pass
 
-class Settings(BaseSettings):
+# All settings are read from this one mapping
+_ENV = os.environ
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Application settings loaded from environment variables
+    """
     # GitHub webhook secret for verifying webhook requests
-    GITHUB_WEBHOOK_SECRET: str = os.environ.get("GITHUB_WEBHOOK_SECRET", "")
-    
-    GITHUB_TOKEN: str = os.environ.get("GITHUB_TOKEN", "")
-    
+    GITHUB_WEBHOOK_SECRET: str = ""
+
+    GITHUB_TOKEN: str = ""
+
     # GitHub API credentials for making authenticated requests
     GITHUB_API_TOKEN: str = ""
-    
+
     # Path to store processed GitHub webhook events
     ACTIONS_FILE_PATH: str = "actions.json"
-    
+
     # Optional logging level
     LOG_LEVEL: str = "INFO"
-    """
-    Application settings loaded from environment variables
-    """
+
     # Server settings
-    PORT: int = int(os.getenv("PORT", 8000))
+    PORT: int = 8000
 
     # Slack settings
-    SLACK_BOT_TOKEN: str = os.getenv("SLACK_BOT_TOKEN", "")
-    SLACK_SIGNING_SECRET: str = os.getenv("SLACK_SIGNING_SECRET", "")
-    SLACK_APP_TOKEN: str = os.getenv("SLACK_APP_TOKEN", "")  # Added for Socket Mode
-    
-    # GitHub settings
-    GITHUB_WEBHOOK_SECRET: str = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+    SLACK_BOT_TOKEN: str = ""
+    SLACK_SIGNING_SECRET: str = ""
+    SLACK_APP_TOKEN: str = ""  # Added for Socket Mode
 
     # Database settings
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
-    
+    DATABASE_URL: str = "sqlite:///./test.db"
+
     # Agent settings
-    agent_seed: str = os.getenv("agent_seed", "")
-    agent_address: str = os.getenv("agent_address", "")
+    agent_seed: str = ""
+    agent_address: str = ""
 
     # Neo4j settings
     NEO4J_URI: str = "neo4j://localhost:7687"
@@ -55,21 +75,42 @@ class Settings(BaseSettings):
     gemini_api_key: Optional[str] = None
     as1_api_key: Optional[str] = None
 
-    class Config:
-        """Pydantic config"""
-        env_file = ".env"
-        case_sensitive = True
-        extra = "ignore"  # Ignore extra fields to prevent validation errors
+@functools.lru_cache(maxsize=1)
+def get_settings():
+    """
+    Build the settings once from the environment
+    """
+    env = _ENV
+    return Settings(
+        GITHUB_WEBHOOK_SECRET=env.get("GITHUB_WEBHOOK_SECRET", ""),
+        GITHUB_TOKEN=env.get("GITHUB_TOKEN", ""),
+        GITHUB_API_TOKEN=env.get("GITHUB_API_TOKEN", ""),
+        ACTIONS_FILE_PATH=env.get("ACTIONS_FILE_PATH", "actions.json"),
+        LOG_LEVEL=env.get("LOG_LEVEL", "INFO"),
+        PORT=int(env.get("PORT", 8000)),
+        SLACK_BOT_TOKEN=env.get("SLACK_BOT_TOKEN", ""),
+        SLACK_SIGNING_SECRET=env.get("SLACK_SIGNING_SECRET", ""),
+        SLACK_APP_TOKEN=env.get("SLACK_APP_TOKEN", ""),
+        DATABASE_URL=env.get("DATABASE_URL", "sqlite:///./test.db"),
+        agent_seed=env.get("agent_seed", ""),
+        agent_address=env.get("agent_address", ""),
+        NEO4J_URI=env.get("NEO4J_URI", "neo4j://localhost:7687"),
+        NEO4J_USERNAME=env.get("NEO4J_USERNAME", "neo4j"),
+        NEO4J_PASSWORD=env.get("NEO4J_PASSWORD", "password"),
+        OPENAI_API_KEY=env.get("OPENAI_API_KEY"),
+        GEMINI_API_KEY=env.get("GEMINI_API_KEY"),
+        AS1_API_KEY=env.get("AS1_API_KEY"),
+        gemini_api_key=env.get("gemini_api_key"),
+        as1_api_key=env.get("as1_api_key"),
+    )
 
-settings = Settings()
+settings = get_settings()
 
 # For debugging only - will show that secrets were loaded correctly
-# Remove this in production!
-# print(f"Loaded GitHub webhook secret: {'*' * len(GITHUB_WEBHOOK_SECRET)} (hidden for security)")
-# print(f"GitHub API token loaded: {bool(settings.GITHUB_API_TOKEN)}")
-# print(f"Actions file path: {settings.ACTIONS_FILE_PATH}")
-print(f"Loaded GitHub webhook secret: {'*' * len(settings.GITHUB_WEBHOOK_SECRET)} (hidden for security)")
-print(f"GitHub secret loaded: {bool(settings.GITHUB_WEBHOOK_SECRET)}")
-print(f"Slack bot token loaded: {bool(settings.SLACK_BOT_TOKEN)}")
-print(f"Slack signing secret loaded: {bool(settings.SLACK_SIGNING_SECRET)}")
-print(f"Slack app token loaded: {bool(settings.SLACK_APP_TOKEN)}")
+# Set LOG_LEVEL=DEBUG (or CONFIG_DEBUG) to print these at startup
+if settings.LOG_LEVEL == "DEBUG" or _ENV.get("CONFIG_DEBUG"):
+    print(f"Loaded GitHub webhook secret: {'*' * len(settings.GITHUB_WEBHOOK_SECRET)} (hidden for security)")
+    print(f"GitHub secret loaded: {bool(settings.GITHUB_WEBHOOK_SECRET)}")
+    print(f"Slack bot token loaded: {bool(settings.SLACK_BOT_TOKEN)}")
+    print(f"Slack signing secret loaded: {bool(settings.SLACK_SIGNING_SECRET)}")
+    print(f"Slack app token loaded: {bool(settings.SLACK_APP_TOKEN)}")
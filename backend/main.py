@@ -44,7 +44,7 @@ from backend.config import settings
 from backend.services.github_service import process_push_event
 from backend.slack_monitor import slack_monitor, start_monitor
 from backend.processTools.rag import query_rag
-from backend.processTools.gemini_rag import query_rag as gemini_query_rag
+from backend.processTools.gemini_rag import aquery_rag as gemini_aquery_rag, aprewarm_http_clients, aclose_http_clients, discover_node_types
 
 app = FastAPI()
 
@@ -57,8 +57,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Global variables to store background threads
+# Global variables to store background threads and tasks
 slack_monitor_thread = None
+gemini_prewarm_task = None
 
 # Add these functions to handle the script execution with proper import paths
 def ensure_process_directories():
@@ -204,13 +205,22 @@ async def startup_event():
         print("Importing data to Neo4j...")
         run_import_to_neo4j()
         print("✅ Successfully imported data to Neo4j")
+        
+        # Recount embeddings so Gemini RAG routing sees the freshly imported nodes
+        discover_node_types()
     except Exception as e:
         print(f"❌ Error during data processing or import: {str(e)}")
+    
+    # Warm the Gemini connection used by /geminichat. This runs after the blocking import work
+    # above, which would otherwise hold the event loop; keep a reference so the task isn't collected.
+    global gemini_prewarm_task
+    gemini_prewarm_task = asyncio.create_task(aprewarm_http_clients())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Server shutting down")
     # Background threads will be automatically terminated as they are daemon threads
+    await aclose_http_clients()
 
 @app.get("/")
 async def root():
@@ -508,7 +518,7 @@ async def gemini_chat_endpoint_post(chat_query: ChatQuery):
         
         # Call the Gemini RAG system with the query
         # Using top_k=15 for better coverage of large datasets
-        answer, node_type, reason = gemini_query_rag(query, top_k=500, capture_debug=debug_info)
+        answer, node_type, reason = await gemini_aquery_rag(query, top_k=15, capture_debug=debug_info)
         
         return {
             "status": "success",
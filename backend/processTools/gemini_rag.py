@@ -1,16 +1,43 @@
 from neo4j import GraphDatabase
 from neo4j_graphrag.retrievers import VectorRetriever
 from neo4j_graphrag.llm import LLMInterface, LLMResponse
-from neo4j_graphrag.generation import GraphRAG
+from neo4j_graphrag.generation import GraphRAG, RagTemplate
 from neo4j_graphrag.embeddings.sentence_transformers import SentenceTransformerEmbeddings
 from neo4j_graphrag.indexes import create_vector_index
+from neo4j_graphrag.exceptions import EmbeddingsGenerationError
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
 import json
+import logging
 import os
 import sys
 import re
+import tempfile
+import textwrap
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+try:
+    import ahocorasick
+except ImportError:  # Fall back to plain substring checks
+    ahocorasick = None
+
+# Use orjson for Gemini request/response bodies when it is installed
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -19,26 +46,8 @@ GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable not set")
 
-# Custom Gemini LLM implementation using direct HTTP requests (no SDK)
-class GeminiHttpLLM(LLMInterface):
-    def __init__(self, model_name="gemini-2.0-flash", model_params=None, **kwargs):
-        self.model_name = model_name
-        self.model_params = model_params or {"temperature": 0.1, "maxOutputTokens": 1024}
-        self.api_key = GEMINI_API_KEY
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
-        
-    def invoke(self, input, message_history=None, system_instruction=None):
-        """
-        Invoke the Gemini API using direct HTTP requests
-        """
-        url = f"{self.api_url}?key={self.api_key}"
-        
-        # Prepare messages for the API
-        contents = []
-        
-        # Add system message if provided
-        if system_instruction is None:
-            system_instruction = """
+# Default system instruction used to help Gemini provide better responses
+_SYSTEM_INSTRUCTION = textwrap.dedent("""
             You are an AI assistant with access to a knowledge graph about developers and their contributions.
             
             Format your responses according to these guidelines:
@@ -51,99 +60,232 @@ class GeminiHttpLLM(LLMInterface):
             7. If you see a numeric user ID in the context, check if there's an associated login or id field and use that instead.
             8. Format GitHub usernames with @ symbol (e.g., @username) to make them stand out.
             9. Only name 1 user at a time NEVER have more than one user in your response
-            """
-        
-        if system_instruction:
-            contents.append({
-                "role": "user",
-                "parts": [{"text": f"System: {system_instruction}"}]
-            })
-            contents.append({
-                "role": "model",
-                "parts": [{"text": "I'll follow these instructions."}]
-            })
+            """).strip()
+
+# Shared HTTP session so repeated Gemini calls reuse the same keep-alive connection
+_SESSION = requests.Session()
+_SESSION.headers.update({'Content-Type': 'application/json'})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Shared async client used by ainvoke so concurrent queries overlap their Gemini latency
+_ACLIENT = httpx.AsyncClient(
+    headers={'Content-Type': 'application/json'},
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=16)
+)
+
+# Default Gemini generation settings, overridable per key through model_params
+_DEFAULT_GENERATION_CONFIG = {"temperature": 0.1, "maxOutputTokens": 1024, "topP": 0.95, "topK": 40}
+
+# Maps a message history role to Gemini's role name; anything that isn't the user is the model
+_GEMINI_ROLE = {"user": "user"}.get
+
+# Custom Gemini LLM implementation using direct HTTP requests (no SDK)
+class GeminiHttpLLM(LLMInterface):
+    def __init__(self, model_name="gemini-2.0-flash", model_params=None, system_instruction=_SYSTEM_INSTRUCTION, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.model_params = model_params or {"temperature": 0.1, "maxOutputTokens": 1024}
+        self.api_key = GEMINI_API_KEY
+        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
+        # The key goes in a header so it stays out of the URL (and out of logged errors)
+        self._headers = {"x-goog-api-key": self.api_key}
+        # Request pieces that are the same for every call, shared read-only between payloads
+        self._generation_config = {
+            key: self.model_params.get(key, default)
+            for key, default in _DEFAULT_GENERATION_CONFIG.items()
+        }
+        self._system_instruction_field = {"parts": [{"text": system_instruction}]} if system_instruction else None
         
-        # Add message history if provided
+    def _build_payload(self, input, message_history=None, system_instruction=None):
+        """
+        Build the generateContent request body for a query
+        """
+        # Single-turn queries (the usual RAG case) skip the history handling entirely
         if message_history:
-            for msg in message_history:
-                role = "user" if msg.role == "user" else "model"
-                contents.append({
-                    "role": role,
-                    "parts": [{"text": msg.content}]
-                })
+            # Prepare messages for the API, starting with the message history
+            contents = [
+                {"role": _GEMINI_ROLE(msg.role, "model"), "parts": [{"text": msg.content}]}
+                for msg in message_history
+            ]
+            contents.append({"role": "user", "parts": [{"text": input}]})
+        else:
+            contents = [{"role": "user", "parts": [{"text": input}]}]
         
-        # Add the user's query
-        contents.append({
-            "role": "user",
-            "parts": [{"text": input}]
-        })
+        payload = {
+            "contents": contents,
+            "generationConfig": self._generation_config
+        }
         
-        # Handle the case where we have no history (just the current query)
-        if not message_history and not system_instruction:
-            # For a single message, use the simpler format
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {
-                                "text": input
-                            }
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": self.model_params.get("temperature", 0.1),
-                    "maxOutputTokens": self.model_params.get("maxOutputTokens", 1024),
-                    "topP": self.model_params.get("topP", 0.95),
-                    "topK": self.model_params.get("topK", 40)
-                }
-            }
+        # Pass the system message through Gemini's native field if provided
+        if system_instruction is None:
+            system_field = self._system_instruction_field
+        elif system_instruction:
+            system_field = {"parts": [{"text": system_instruction}]}
         else:
-            # For conversation with history, use the multi-turn format
-            payload = {
-                "contents": contents,
-                "generationConfig": {
-                    "temperature": self.model_params.get("temperature", 0.1),
-                    "maxOutputTokens": self.model_params.get("maxOutputTokens", 1024),
-                    "topP": self.model_params.get("topP", 0.95),
-                    "topK": self.model_params.get("topK", 40)
-                }
-            }
+            system_field = None
+        if system_field:
+            payload["system_instruction"] = system_field
         
-        # Make the API request
-        headers = {
-            'Content-Type': 'application/json'
-        }
+        return payload
+
+    @staticmethod
+    def _parse_response(response_data):
+        """
+        Extract the answer text from a generateContent response body
+        """
+        if "candidates" in response_data and len(response_data["candidates"]) > 0:
+            candidate = response_data["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                text = ""
+                for part in candidate["content"]["parts"]:
+                    if "text" in part:
+                        text += part["text"]
+                return LLMResponse(content=text)
+        
+        # If we couldn't extract a proper response
+        return LLMResponse(content="Error: Unable to parse response from Gemini API")
+
+    def invoke(self, input, message_history=None, system_instruction=None):
+        """
+        Invoke the Gemini API using direct HTTP requests
+        """
+        payload = self._build_payload(input, message_history, system_instruction)
         
+        # Make the API request over the shared session
+        response = None
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            response = _SESSION.post(self.api_url, data=_json_dumps(payload), headers=self._headers, timeout=30)
             response.raise_for_status()  # Raise exception for 4XX/5XX responses
             
-            response_data = response.json()
+            return self._parse_response(_json_loads(response.content))
             
-            # Extract the content from the response
-            if "candidates" in response_data and len(response_data["candidates"]) > 0:
-                candidate = response_data["candidates"][0]
-                if "content" in candidate and "parts" in candidate["content"]:
-                    text = ""
-                    for part in candidate["content"]["parts"]:
-                        if "text" in part:
-                            text += part["text"]
-                    return LLMResponse(content=text)
+        except Exception as e:
+            logger.error(f"Error calling Gemini API: {e}")
+            if response is not None and hasattr(response, 'text'):
+                logger.error(f"Response: {response.text}")
+            return LLMResponse(content=f"Error: {str(e)}")
+
+    async def ainvoke(self, input, message_history=None, system_instruction=None):
+        """
+        Invoke the Gemini API without blocking the event loop
+        """
+        payload = self._build_payload(input, message_history, system_instruction)
+        
+        response = None
+        try:
+            response = await _ACLIENT.post(self.api_url, content=_json_dumps(payload), headers=self._headers)
+            response.raise_for_status()  # Raise exception for 4XX/5XX responses
             
-            # If we couldn't extract a proper response
-            return LLMResponse(content="Error: Unable to parse response from Gemini API")
+            return self._parse_response(_json_loads(response.content))
             
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
-            if response and hasattr(response, 'text'):
-                print(f"Response: {response.text}")
+            logger.error(f"Error calling Gemini API: {e}")
+            if response is not None and hasattr(response, 'text'):
+                logger.error(f"Response: {response.text}")
             return LLMResponse(content=f"Error: {str(e)}")
 
-    async def ainvoke(self, input, message_history=None, system_instruction=None):
-        return self.invoke(input, message_history, system_instruction)  # Synchronous fallback for async calls
+
+async def aprewarm_http_clients():
+    """
+    Open the async client's keep-alive connection to Gemini so the first query skips DNS and TLS setup
+    (call from the app startup hook)
+    """
+    try:
+        await _ACLIENT.head("https://generativelanguage.googleapis.com/", timeout=5.0)
+    except httpx.HTTPError as e:
+        logger.debug(f"Could not prewarm Gemini connection: {e}")
 
 
+async def aclose_http_clients():
+    """
+    Close the shared async HTTP client (call from the app shutdown hook)
+    """
+    await _ACLIENT.aclose()
+
+
+# Search term mappings used to score a query against each node type
+NODE_TYPE_KEYWORDS = {
+    "PullRequest": ["pr", "pull request", "code change", "merge", "branch", "commit", "git", "repository", "repo", "developer", "contribution", "feature", "oauth", "implementation"],
+    "Issue": ["issue", "bug", "ticket", "problem", "task", "feature request", "enhancement", "error", "defect", "tracker"],
+    "Message": ["chat", "slack", "message", "conversation", "discussion", "said", "mentioned", "talk", "channel", "communication", "discuss"],
+    "TextChunk": [] # Fallback, no specific keywords
+}
+
+# Flat (keyword, node_type) pairs for the plain substring fallback
+_KEYWORDS = tuple((keyword, node_type) for node_type, keywords in NODE_TYPE_KEYWORDS.items() for keyword in keywords)
+
+# Phrases that select a node type outright, checked in this order
+PRIORITY_TRIGGERS = [
+    ("Issue", ["who reported", "issue reporter", "bug report", "filed an issue"], "Query specifically asks about issues"),
+    ("PullRequest", ["who wrote", "who implemented", "who coded", "who developed", "oauth", "integration", "author"], "Query asks about code authorship or implementation"),
+    ("Message", ["who said", "who mentioned", "who discussed", "who talked", "conversation", "chat", "slack"], "Query asks about discussions or conversations"),
+]
+
+def _build_keyword_automaton():
+    """
+    Compile the keywords and priority phrases into one Aho-Corasick automaton
+
+    Returns:
+        The automaton, or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+
+    # A phrase can belong to several node types, so collect all of its tags first
+    tags = {}
+    for node_type, keywords in NODE_TYPE_KEYWORDS.items():
+        for keyword in keywords:
+            tags.setdefault(keyword, []).append(("keyword", node_type))
+    for node_type, phrases, _ in PRIORITY_TRIGGERS:
+        for phrase in phrases:
+            tags.setdefault(phrase, []).append(("priority", node_type))
+
+    automaton = ahocorasick.Automaton()
+    for phrase, phrase_tags in tags.items():
+        automaton.add_word(phrase, (phrase, tuple(phrase_tags)))
+    automaton.make_automaton()
+    return automaton
+
+_AUTOMATON = _build_keyword_automaton()
+
+# Each priority phrase list as one precompiled alternation, used when pyahocorasick is missing
+_PRIORITY_PATTERNS = [
+    (node_type, re.compile("|".join(re.escape(phrase) for phrase in phrases)))
+    for node_type, phrases, _ in PRIORITY_TRIGGERS
+]
+
+def _match_keywords(query):
+    """
+    Find the priority phrases and keywords contained in a lowercased query
+
+    Returns:
+        Tuple of (node types hit by a priority phrase, dict of node type -> number of distinct keywords found)
+    """
+    priority_hits = set()
+
+    if _AUTOMATON is not None:
+        # Single pass over the query; each keyword counts once however often it occurs
+        keyword_hits = {}
+        for _, (phrase, phrase_tags) in _AUTOMATON.iter(query):
+            for kind, node_type in phrase_tags:
+                if kind == "priority":
+                    priority_hits.add(node_type)
+                else:
+                    keyword_hits.setdefault(node_type, set()).add(phrase)
+        return priority_hits, {node_type: len(found) for node_type, found in keyword_hits.items()}
+
+    for node_type, pattern in _PRIORITY_PATTERNS:
+        if pattern.search(query):
+            priority_hits.add(node_type)
+
+    keyword_counts = {}
+    for keyword, node_type in _KEYWORDS:
+        if keyword in query:
+            keyword_counts[node_type] = keyword_counts.get(node_type, 0) + 1
+    return priority_hits, keyword_counts
+
 def determine_best_node_type(query_text, available_node_types):
     """
     Analyzes the query text to determine which node type would be most relevant
@@ -156,36 +298,15 @@ def determine_best_node_type(query_text, available_node_types):
         Tuple of (node_label, index_name, reason)
     """
     query = query_text.lower()
-    
-    # Define search term mappings
-    node_type_keywords = {
-        "PullRequest": ["pr", "pull request", "code change", "merge", "branch", "commit", "git", "repository", "repo", "developer", "contribution", "feature", "oauth", "implementation"],
-        "Issue": ["issue", "bug", "ticket", "problem", "task", "feature request", "enhancement", "error", "defect", "tracker"],
-        "Message": ["chat", "slack", "message", "conversation", "discussion", "said", "mentioned", "talk", "channel", "communication", "discuss"],
-        "TextChunk": [] # Fallback, no specific keywords
-    }
+    priority_hits, keyword_counts = _match_keywords(query)
     
     # Check for highest priority node types first if they have embeddings
-    if "Issue" in available_node_types and available_node_types["Issue"] > 0:
-        if any(term in query for term in ["who reported", "issue reporter", "bug report", "filed an issue"]):
-            return "Issue", f"issue_vector_idx", "Query specifically asks about issues"
-    
-    if "PullRequest" in available_node_types and available_node_types["PullRequest"] > 0:
-        if any(term in query for term in ["who wrote", "who implemented", "who coded", "who developed", "oauth", "integration", "author"]):
-            return "PullRequest", f"pullrequest_vector_idx", "Query asks about code authorship or implementation"
-    
-    if "Message" in available_node_types and available_node_types["Message"] > 0:
-        if any(term in query for term in ["who said", "who mentioned", "who discussed", "who talked", "conversation", "chat", "slack"]):
-            return "Message", f"message_vector_idx", "Query asks about discussions or conversations"
+    for node_type, _, reason in PRIORITY_TRIGGERS:
+        if node_type in priority_hits and available_node_types.get(node_type, 0) > 0:
+            return node_type, f"{node_type.lower()}_vector_idx", reason
             
     # Count keyword matches for each node type
-    scores = {node_type: 0 for node_type in available_node_types}
-    
-    for node_type, keywords in node_type_keywords.items():
-        if node_type in available_node_types and available_node_types[node_type] > 0:
-            for keyword in keywords:
-                if keyword in query:
-                    scores[node_type] += 1
+    scores = {node_type: keyword_counts.get(node_type, 0) for node_type in available_node_types}
     
     # Find the node type with the highest score
     max_score = -1
@@ -217,53 +338,160 @@ EMBEDDING_PROPERTY = "embedding"  # Property where embeddings are stored
 EMBEDDING_DIMENSION = 384  # Dimension for all-MiniLM-L6-v2
 
 # Connect to Neo4j database
-driver = GraphDatabase.driver(URI, auth=AUTH)
+driver = GraphDatabase.driver(
+    URI,
+    auth=AUTH,
+    max_connection_pool_size=50,
+    connection_acquisition_timeout=10
+)
+
+# Node types that can be searched, and where their embedding counts are cached between processes
+NODE_TYPES = ["TextChunk", "PullRequest", "Issue", "Message"]
+NODE_TYPES_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "lahacks2025", "node_types.json")
+NODE_TYPES_CACHE_TTL = 3600  # Seconds before the cached counts are refreshed
 
-# Check Neo4j version and get available node types with embeddings
+# Count nodes with embeddings for every node type in a single query
+EMBEDDING_COUNTS_QUERY = " UNION ALL ".join(
+    f"MATCH (n:{node_label}) WHERE n.{EMBEDDING_PROPERTY} IS NOT NULL RETURN '{node_label}' AS label, count(n) AS count"
+    for node_label in NODE_TYPES
+)
+
+# Node types with counts of available embeddings (updated in place on refresh)
 available_node_types = {}
-try:
-    with driver.session() as session:
-        # Check Neo4j version
-        result = session.run("CALL dbms.components() YIELD versions RETURN versions[0] as version")
-        record = result.single()
-        version = record["version"] if record else "unknown"
-        print(f"Neo4j version: {version}")
-        
-        # List all existing indexes
-        print("Checking for existing indexes...")
-        result = session.run("SHOW INDEXES")
-        indexes = [dict(record) for record in result]
-        if indexes:
-            print("Existing indexes:")
-            for idx in indexes:
-                print(f"  - {idx.get('name', 'unknown')} (type: {idx.get('type', 'unknown')}, labels: {idx.get('labelsOrTypes', [])})")
-        else:
-            print("No indexes found in the database.")
-        
-        # Check for nodes with embeddings for each important node type
-        for node_label in ["TextChunk", "PullRequest", "Issue", "Message"]:
-            result = session.run(f"MATCH (n:{node_label}) WHERE n.{EMBEDDING_PROPERTY} IS NOT NULL RETURN count(n) as count")
+
+def _read_node_types_cache():
+    """
+    Read the cached node type counts from disk
+
+    Returns:
+        Tuple of (timestamp, node_types), or (None, None) if there is no usable cache
+        for the database at URI
+    """
+    try:
+        with open(NODE_TYPES_CACHE_PATH, "r") as f:
+            cached = json.load(f)
+        if cached["uri"] != URI:
+            return None, None
+        return cached["timestamp"], cached["node_types"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def _write_json_atomic(path, data):
+    """
+    Write JSON to path via a temp file and os.replace, so concurrent workers never see a partial file
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def discover_node_types():
+    """
+    Check Neo4j for the available node types with embeddings and refresh the on-disk cache
+
+    Returns:
+        Dict of node types with counts of available embeddings
+    """
+    node_types = {}
+    try:
+        with driver.session() as session:
+            # Check Neo4j version
+            result = session.run("CALL dbms.components() YIELD versions RETURN versions[0] as version")
             record = result.single()
-            count = record["count"] if record and record["count"] > 0 else 0
-            available_node_types[node_label] = count
-            if count > 0:
-                print(f"Found {count} {node_label} nodes with embeddings.")
-            else:
-                print(f"No {node_label} nodes with embeddings found.")
-                
-except Exception as e:
-    print(f"Error checking database state: {e}")
+            version = record["version"] if record else "unknown"
+            logger.debug(f"Neo4j version: {version}")
+            
+            # List all existing indexes
+            logger.debug("Checking for existing indexes...")
+            result = session.run("SHOW INDEXES")
+            indexes = [dict(record) for record in result]
+            if logger.isEnabledFor(logging.DEBUG):
+                if indexes:
+                    logger.debug("Existing indexes:")
+                    for idx in indexes:
+                        logger.debug(f"  - {idx.get('name', 'unknown')} (type: {idx.get('type', 'unknown')}, labels: {idx.get('labelsOrTypes', [])})")
+                else:
+                    logger.debug("No indexes found in the database.")
+            
+            # Check for nodes with embeddings for each important node type in one round trip
+            for record in session.run(EMBEDDING_COUNTS_QUERY):
+                node_label = record["label"]
+                count = record["count"] if record["count"] > 0 else 0
+                node_types[node_label] = count
+                if count > 0:
+                    logger.debug(f"Found {count} {node_label} nodes with embeddings.")
+                else:
+                    logger.debug(f"No {node_label} nodes with embeddings found.")
+                    
+    except Exception as e:
+        logger.error(f"Error checking database state: {e}")
+        return available_node_types
+
+    available_node_types.update(node_types)
+
+    # Persist the counts so the next process can skip the database scan. An empty graph is
+    # not cached, so embeddings imported after startup are picked up on the next restart.
+    if any(node_types.values()):
+        try:
+            _write_json_atomic(NODE_TYPES_CACHE_PATH, {"uri": URI, "timestamp": time.time(), "node_types": node_types})
+        except OSError as e:
+            logger.warning(f"Error writing node type cache: {e}")
+
+    return available_node_types
+
+# Serve cached counts immediately; refresh stale ones in the background
+_cached_at, _cached_node_types = _read_node_types_cache()
+if _cached_node_types is None:
+    discover_node_types()
+else:
+    available_node_types.update(_cached_node_types)
+    if time.time() - _cached_at >= NODE_TYPES_CACHE_TTL:
+        threading.Thread(target=discover_node_types, daemon=True).start()
+
+# Vector indexes already confirmed to exist in this process
+_ENSURED_INDEXES = set()
 
 # Function to ensure a vector index exists for a given node type
-def ensure_vector_index(node_label, index_name):
-    print(f"\nEnsuring vector index '{index_name}' exists for {node_label} nodes...")
+def ensure_vector_index(node_label, index_name, session=None):
+    """
+    Make sure the vector index exists, creating it if needed
+
+    Args:
+        node_label: Node label the index covers
+        index_name: Name of the vector index
+        session: Open Neo4j session to run the checks in (a new one is opened if omitted)
+
+    Returns:
+        True if the index exists or was created, False otherwise
+    """
+    if index_name in _ENSURED_INDEXES:
+        return True
+
+    # Labels and index names cannot be parameters in DDL, so only allow known values
+    if node_label not in NODE_TYPES or not re.fullmatch(r"\w+", index_name):
+        logger.warning(f"Refusing to create vector index '{index_name}' for unknown node type {node_label}.")
+        return False
+
+    if session is None:
+        with driver.session() as session:
+            return _ensure_vector_index(node_label, index_name, session)
+    return _ensure_vector_index(node_label, index_name, session)
+
+def _ensure_vector_index(node_label, index_name, session):
+    logger.debug(f"Ensuring vector index '{index_name}' exists for {node_label} nodes...")
     try:
         # Check if index already exists
-        with driver.session() as session:
-            result = session.run(f"SHOW INDEXES WHERE name = '{index_name}'")
-            if result.single():
-                print(f"Vector index '{index_name}' already exists.")
-                return True
+        result = session.run("SHOW INDEXES YIELD name WHERE name = $n RETURN name", n=index_name)
+        if result.single():
+            logger.debug(f"Vector index '{index_name}' already exists.")
+            _ENSURED_INDEXES.add(index_name)
+            return True
                 
         # Create the index if it doesn't exist
         create_vector_index(
@@ -275,50 +503,165 @@ def ensure_vector_index(node_label, index_name):
             similarity_fn="cosine",
             fail_if_exists=False
         )
-        print(f"Vector index '{index_name}' created successfully.")
+        logger.debug(f"Vector index '{index_name}' created successfully.")
+        _ENSURED_INDEXES.add(index_name)
         return True
     except Exception as e:
-        print(f"Error creating vector index using neo4j_graphrag: {e}")
-        print("\nTrying direct Cypher approach instead...")
+        logger.warning(f"Error creating vector index using neo4j_graphrag: {e}")
+        logger.debug("Trying direct Cypher approach instead...")
         
         try:
-            with driver.session() as session:
-                # Try creating the index with direct Cypher for compatibility
-                cypher = f"""
-                CREATE VECTOR INDEX {index_name} IF NOT EXISTS
-                FOR (n:{node_label})
-                ON (n.{EMBEDDING_PROPERTY})
-                OPTIONS {{indexConfig: {{`vector.dimensions`: {EMBEDDING_DIMENSION}, `vector.similarity_function`: 'cosine'}}}}
-                """
-                session.run(cypher)
-                print(f"Vector index '{index_name}' created with direct Cypher.")
-                return True
+            # Try creating the index with direct Cypher for compatibility
+            cypher = f"""
+            CREATE VECTOR INDEX {index_name} IF NOT EXISTS
+            FOR (n:{node_label})
+            ON (n.{EMBEDDING_PROPERTY})
+            OPTIONS {{indexConfig: {{`vector.dimensions`: {EMBEDDING_DIMENSION}, `vector.similarity_function`: 'cosine'}}}}
+            """
+            session.run(cypher)
+            logger.debug(f"Vector index '{index_name}' created with direct Cypher.")
+            _ENSURED_INDEXES.add(index_name)
+            return True
         except Exception as e2:
-            print(f"Error creating index with direct Cypher: {e2}")
+            logger.error(f"Error creating index with direct Cypher: {e2}")
             return False
 
-# Create embedder using SentenceTransformerEmbeddings from the library
-print("\nInitializing sentence transformer embedder...")
-embedder = SentenceTransformerEmbeddings(model="all-MiniLM-L6-v2")
+# Sentence transformer embedder that remembers recent query embeddings
+class CachedEmbeddings(SentenceTransformerEmbeddings):
+    def __init__(self, model="all-MiniLM-L6-v2", cache_size=4096, **kwargs):
+        import torch
 
-# Query the graph function
-def query_rag(query_text, top_k=500, capture_debug=None):
+        # Run on the GPU in half precision when one is available
+        use_cuda = torch.cuda.is_available()
+        if use_cuda:
+            kwargs.setdefault("device", "cuda")
+        super().__init__(model, **kwargs)
+        if use_cuda:
+            self.model.half()
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _cache_get(self, text):
+        with self._cache_lock:
+            embedding = self._cache.get(text)
+            if embedding is not None:
+                self._cache.move_to_end(text)
+            return embedding
+
+    def _cache_put(self, text, embedding):
+        with self._cache_lock:
+            self._cache[text] = embedding
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text):
+        """
+        Embed a single query, reusing the cached vector for repeated text
+        """
+        embedding = self._cache_get(text)
+        if embedding is None:
+            try:
+                embedding = tuple(self.model.encode(text, convert_to_numpy=True).tolist())
+            except Exception as e:
+                raise EmbeddingsGenerationError(f"Failed to generate embedding with SentenceTransformer: {e}") from e
+            self._cache_put(text, embedding)
+        return list(embedding)
+
+    def encode_batch(self, texts):
+        """
+        Embed several queries, running one forward pass for all uncached texts
+        """
+        embeddings = {text: self._cache_get(text) for text in texts}
+        missing = [text for text, embedding in embeddings.items() if embedding is None]
+        if missing:
+            try:
+                vectors = self.model.encode(missing, convert_to_numpy=True)
+            except Exception as e:
+                raise EmbeddingsGenerationError(f"Failed to generate embeddings with SentenceTransformer: {e}") from e
+            for text, vector in zip(missing, vectors):
+                embeddings[text] = tuple(vector.tolist())
+                self._cache_put(text, embeddings[text])
+        return [list(embeddings[text]) for text in texts]
+
+    def warm_up(self):
+        """
+        Run one throwaway encode so the first real query skips lazy model setup
+        """
+        self.model.encode("warm up", convert_to_numpy=True)
+
+# Embedder is created on first use so processes that never run a query skip loading the model
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
     """
-    Query the graph using RAG and return the answer with metadata.
-    
-    Args:
-        query_text (str): The user's query
-        top_k (int): Maximum number of relevant documents to retrieve (increased from 5 to 15 for better coverage on large datasets)
-        capture_debug (dict, optional): Dictionary to capture debug information
+    Return the shared sentence transformer embedder, loading it on first call
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                logger.debug("Initializing sentence transformer embedder...")
+                embedder = CachedEmbeddings(model="all-MiniLM-L6-v2")
+                embedder.warm_up()
+                _embedder = embedder
+    return _embedder
+
+# RAG pipelines reused across queries, keyed by vector index name
+_RAG_CACHE = {}
+
+def _get_rag(index_name):
+    """
+    Return the RAG pipeline for an index, building it on first use
+    """
+    rag = _RAG_CACHE.get(index_name)
+    if rag is None:
+        # Initialize the retriever with the selected index name
+        logger.debug(f"Initializing vector retriever with index '{index_name}'...")
+        retriever = VectorRetriever(driver, index_name, get_embedder())
         
+        # Initialize Gemini LLM with direct HTTP implementation
+        logger.debug("Initializing Gemini HTTP LLM...")
+        llm = GeminiHttpLLM(
+            model_name="gemini-2.0-flash", 
+            model_params={
+                "temperature": 0.1, 
+                "maxOutputTokens": 1024,
+                "topP": 0.95,
+                "topK": 40
+            }
+        )
+        
+        # Initialize the RAG pipeline
+        logger.debug("Creating RAG pipeline...")
+        # GraphRAG always passes the template's system instructions to the LLM, so set ours there
+        rag = GraphRAG(
+            retriever=retriever,
+            llm=llm,
+            prompt_template=RagTemplate(system_instructions=_SYSTEM_INSTRUCTION)
+        )
+        _RAG_CACHE[index_name] = rag
+    return rag
+
+def _select_index(query_text, top_k, capture_debug):
+    """
+    Pick the node type and vector index for a query and record the choice in capture_debug
+
     Returns:
-        tuple: (answer, node_type, reason) - The answer text, node type used, and reason for selection
+        Tuple of (node_label, index_name, reason)
     """
+    if top_k > 100:
+        logger.warning(f"top_k={top_k} retrieves more context than Gemini can make use of; consider 10-20.")
+    
     # Determine the best node type for this query
     node_label, index_name, reason = determine_best_node_type(query_text, available_node_types)
-    print(f"\nAnalyzing query: '{query_text}'")
-    print(f"Selected {node_label} nodes with '{index_name}' index")
-    print(f"Reason: {reason}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Analyzing query: '{query_text}'")
+        logger.debug(f"Selected {node_label} nodes with '{index_name}' index")
+        logger.debug(f"Reason: {reason}")
     
     # Capture debug information if requested
     if capture_debug is not None:
@@ -328,60 +671,62 @@ def query_rag(query_text, top_k=500, capture_debug=None):
         capture_debug["selection_reason"] = reason
         capture_debug["available_node_types"] = available_node_types
     
-    # Ensure the vector index exists
-    if not ensure_vector_index(node_label, index_name):
-        print(f"Failed to create vector index for {node_label}. Falling back to TextChunk.")
-        node_label = "TextChunk"
-        index_name = "textchunk_vector_idx"
-        if not ensure_vector_index(node_label, index_name):
-            print("Failed to create fallback index. Cannot continue.")
-            return f"Error: Unable to create necessary vector indexes.", node_label, "Failed to create index"
+    return node_label, index_name, reason
+
+def _fallback_to_textchunk(node_label, session=None):
+    """
+    Switch to the TextChunk index after the selected index could not be created
+
+    Returns:
+        Tuple of (node_label, index_name), with index_name None if the fallback index is unavailable too
+    """
+    logger.warning(f"Failed to create vector index for {node_label}. Falling back to TextChunk.")
+    if ensure_vector_index("TextChunk", "textchunk_vector_idx", session):
+        return "TextChunk", "textchunk_vector_idx"
+    logger.error("Failed to create fallback index. Cannot continue.")
+    return "TextChunk", None
+
+# Returned when neither the selected nor the fallback index can be created
+_INDEX_FAILURE_RESULT = ("Error: Unable to create necessary vector indexes.", "TextChunk", "Failed to create index")
+
+def _error_result(e, node_label, capture_debug):
+    """
+    Log a RAG pipeline failure and build the error tuple returned to the caller
+    """
+    logger.error(f"Error in RAG pipeline: {e}")
     
-    try:
-        # Initialize the retriever with the selected index name
-        print(f"Initializing vector retriever with index '{index_name}'...")
-        retriever = VectorRetriever(driver, index_name, embedder)
-        
-        # Initialize Gemini LLM with direct HTTP implementation
-        print("Initializing Gemini HTTP LLM...")
-        llm = GeminiHttpLLM(
-            model_name="gemini-2.0-flash", 
-            model_params={
-                "temperature": 0.1, 
-                "maxOutputTokens": 1024,
-                "topP": 0.95,
-                "topK": 40
-            }
-        )
+    if capture_debug is not None:
+        capture_debug["error"] = str(e)
         
-        # Initialize the RAG pipeline
-        print("Creating RAG pipeline...")
-        rag = GraphRAG(retriever=retriever, llm=llm)
+    return f"Error querying the knowledge graph: {str(e)}", node_label, "Error during query"
+
+# Query the graph function
+def query_rag(query_text, top_k=15, capture_debug=None):
+    """
+    Query the graph using RAG and return the answer with metadata.
+    
+    Args:
+        query_text (str): The user's query
+        top_k (int): Maximum number of relevant documents to retrieve (values above 100 mostly add prompt tokens)
+        capture_debug (dict, optional): Dictionary to capture debug information
         
-        # Set up a system instruction to help Gemini provide better responses
-        system_instruction = """
-        You are an AI assistant with access to a knowledge graph about developers and their contributions.
-            
-        Format your responses according to these guidelines:
-        1. Begin with a direct and concise answer to the question.
-        2. Follow with 2-3 sentences of supporting details or context.
-        3. If providing technical information, highlight key technical terms.
-        4. If uncertain about any part of the answer, clearly indicate what's uncertain.
-        5. Keep your answer focused and avoid tangential information.
-        6. When referring to a user, ALWAYS use their Github login name (not numeric IDs).
-        7. If you see a numeric user ID in the context, check if there's an associated login or id field and use that instead.
-        8. Format GitHub usernames with @ symbol (e.g., @username) to make them stand out.
-        9. Only name 1 user at a time NEVER have more than one user in your response
-        """
+    Returns:
+        tuple: (answer, node_type, reason) - The answer text, node type used, and reason for selection
+    """
+    node_label, index_name, reason = _select_index(query_text, top_k, capture_debug)
+    
+    # Ensure the vector index exists, reusing one session for the check and any fallback
+    with driver.session() as session:
+        if not ensure_vector_index(node_label, index_name, session):
+            node_label, index_name = _fallback_to_textchunk(node_label, session)
+    if index_name is None:
+        return _INDEX_FAILURE_RESULT
+    
+    try:
+        rag = _get_rag(index_name)
         
         # Execute the query
-        print(f"Executing query...")
-        # Check if the LLM accepts system instructions separately
-        if hasattr(llm, 'set_system_instruction'):
-            llm.set_system_instruction(system_instruction)
-            
-        # Instead of passing search_kwargs, we'll set the system instruction directly in the LLM
-        # before calling search
+        logger.debug("Executing query...")
         response = rag.search(
             query_text=query_text, 
             retriever_config={"top_k": top_k}
@@ -401,13 +746,56 @@ def query_rag(query_text, top_k=500, capture_debug=None):
         
         return response.answer, node_label, reason
     except Exception as e:
-        error_message = f"Error in RAG pipeline: {e}"
-        print(error_message)
+        return _error_result(e, node_label, capture_debug)
+
+
+async def aquery_rag(query_text, top_k=15, capture_debug=None):
+    """
+    Async version of query_rag that overlaps query embedding with the index check
+    and calls Gemini without blocking the event loop.
+    
+    Args:
+        query_text (str): The user's query
+        top_k (int): Maximum number of relevant documents to retrieve (values above 100 mostly add prompt tokens)
+        capture_debug (dict, optional): Dictionary to capture debug information
+        
+    Returns:
+        tuple: (answer, node_type, reason) - The answer text, node type used, and reason for selection
+    """
+    node_label, index_name, reason = _select_index(query_text, top_k, capture_debug)
+    
+    try:
+        # Embed the query while the vector index is checked; neither depends on the other
+        query_vector, index_ok = await asyncio.gather(
+            asyncio.to_thread(lambda: get_embedder().embed_query(query_text)),
+            asyncio.to_thread(ensure_vector_index, node_label, index_name)
+        )
+        if not index_ok:
+            node_label, index_name = await asyncio.to_thread(_fallback_to_textchunk, node_label)
+        if index_name is None:
+            return _INDEX_FAILURE_RESULT
         
+        # Building the retriever queries Neo4j, so keep it off the event loop as well
+        rag = await asyncio.to_thread(_get_rag, index_name)
+        
+        # Run the vector search with the precomputed embedding, then call the LLM the way
+        # neo4j_graphrag.generation.GraphRAG.search (1.22.0, pinned in requirements.txt) does:
+        # newline-joined item contents, prompt_template.format with empty examples, and the
+        # template's system_instructions. Re-check this block when upgrading neo4j-graphrag.
+        logger.debug("Executing query...")
+        retriever_result = await asyncio.to_thread(rag.retriever.search, query_vector=query_vector, top_k=top_k)
+        context = "\n".join(item.content for item in retriever_result.items)
+        prompt = rag.prompt_template.format(query_text=query_text, context=context, examples="")
+        response = await rag.llm.ainvoke(prompt, system_instruction=rag.prompt_template.system_instructions)
+        
+        # Capture retrieved context if debug is enabled
         if capture_debug is not None:
-            capture_debug["error"] = str(e)
-            
-        return f"Error querying the knowledge graph: {str(e)}", node_label, "Error during query"
+            capture_debug["retrieved_docs_count"] = top_k
+            capture_debug["contexts"] = [item.content for item in retriever_result.items]
+        
+        return response.content, node_label, reason
+    except Exception as e:
+        return _error_result(e, node_label, capture_debug)
 
 
 # Process the query if running as a script directly